@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Rough per-job footprint of each pipeline stage. Runtime is expressed per second
+# of input video and is refined from observed runs as jobs complete.
+# The Whisper model is loaded once per process and stays resident outside this
+# budget, so transcription memory_mb is only the per-job working memory. A model
+# instance cannot run two transcriptions at once, hence max_running.
+STAGE_COSTS = {
+    'transcription': {'memory_mb': 600, 'cpus': 2, 'seconds_per_video_second': 0.5, 'max_running': 1},
+    'encoding': {'memory_mb': 400, 'cpus': 1, 'seconds_per_video_second': 0.3},
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, stage, estimated_wait):
+        super().__init__(f"Server is at capacity for {stage}, estimated wait {estimated_wait:.0f}s")
+        self.stage = stage
+        self.estimated_wait = estimated_wait
+
+
+class _Job:
+    def __init__(self, stage, video_duration, memory_mb, cpus, runtime):
+        self.stage = stage
+        self.video_duration = video_duration
+        self.memory_mb = memory_mb
+        self.cpus = cpus
+        self.runtime = runtime
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        # Callers clear this when the stage bailed out early, so the short run
+        # does not drag down the runtime estimate
+        self.succeeded = True
+
+
+class AdmissionController:
+    def __init__(self, memory_budget_mb, cpu_budget, max_queue=16, max_wait=1800,
+                 aging_rate=1.0, stage_costs=None):
+        self.memory_budget_mb = memory_budget_mb
+        self.cpu_budget = cpu_budget
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        # Seconds of video credited to a queued job for every second it waits,
+        # so long videos still get their turn under a steady stream of short ones
+        self.aging_rate = aging_rate
+        self.stage_costs = {stage: dict(cost) for stage, cost in (stage_costs or STAGE_COSTS).items()}
+        self.memory_in_use = 0
+        self.cpus_in_use = 0
+        self.peak_memory_mb = 0
+        self._condition = threading.Condition()
+        self._queue = []
+        self._running = []
+
+    def _new_job(self, stage, video_duration):
+        cost = self.stage_costs[stage]
+        # A job bigger than the whole budget is clamped so it can still run alone
+        memory_mb = min(cost['memory_mb'], self.memory_budget_mb)
+        cpus = min(cost['cpus'], self.cpu_budget)
+        runtime = cost['seconds_per_video_second'] * video_duration
+        return _Job(stage, video_duration, memory_mb, cpus, runtime)
+
+    def _priority(self, job, now):
+        return job.video_duration - self.aging_rate * (now - job.enqueued_at)
+
+    def _stage_full(self, stage):
+        max_running = self.stage_costs[stage].get('max_running')
+        return max_running is not None and sum(r.stage == stage for r in self._running) >= max_running
+
+    def _next_job(self):
+        # Jobs held back only by their stage's concurrency limit are skipped, so they
+        # do not block jobs of other stages that could use the free budget
+        now = time.monotonic()
+        candidates = [job for job in self._queue if not self._stage_full(job.stage)]
+        return min(candidates, key=lambda job: self._priority(job, now), default=None)
+
+    def _fits(self, job):
+        if self._stage_full(job.stage):
+            return False
+        return (self.memory_in_use + job.memory_mb <= self.memory_budget_mb
+                and self.cpus_in_use + job.cpus <= self.cpu_budget)
+
+    def _estimate_wait(self, job):
+        # Resource-seconds still owed to running jobs and to queued jobs that would
+        # be served first, spread over the budget of the scarcest resource
+        # (or over the stage's concurrency limit, if it has one)
+        now = time.monotonic()
+        memory_seconds = 0
+        cpu_seconds = 0
+        stage_seconds = 0
+        for running in self._running:
+            remaining = max(0, running.started_at + running.runtime - now)
+            memory_seconds += running.memory_mb * remaining
+            cpu_seconds += running.cpus * remaining
+            if running.stage == job.stage:
+                stage_seconds += remaining
+        job_priority = self._priority(job, now)
+        for queued in self._queue:
+            if queued is not job and self._priority(queued, now) <= job_priority:
+                memory_seconds += queued.memory_mb * queued.runtime
+                cpu_seconds += queued.cpus * queued.runtime
+                if queued.stage == job.stage:
+                    stage_seconds += queued.runtime
+        estimate = max(memory_seconds / self.memory_budget_mb, cpu_seconds / self.cpu_budget)
+        max_running = self.stage_costs[job.stage].get('max_running')
+        if max_running is not None:
+            estimate = max(estimate, stage_seconds / max_running)
+        return estimate
+
+    def _start(self, job):
+        self.memory_in_use += job.memory_mb
+        self.cpus_in_use += job.cpus
+        self.peak_memory_mb = max(self.peak_memory_mb, self.memory_in_use)
+        job.started_at = time.monotonic()
+        self._running.append(job)
+
+    @contextmanager
+    def admit(self, stage, video_duration, on_queued=None, can_reject=True):
+        # can_reject=False always queues, for later stages of a job that already
+        # spent its earlier stages' work
+        job = self._new_job(stage, video_duration)
+        estimated_wait = None
+        with self._condition:
+            if self._queue or not self._fits(job):
+                if can_reject and len(self._queue) >= self.max_queue:
+                    raise AdmissionRejected(stage, self._estimate_wait(job))
+                estimated_wait = self._estimate_wait(job)
+                if can_reject and estimated_wait > self.max_wait:
+                    raise AdmissionRejected(stage, estimated_wait)
+                self._queue.append(job)
+            else:
+                self._start(job)
+
+        if estimated_wait is not None:
+            try:
+                while True:
+                    # Called on every wake-up, without the lock held, with a fresh
+                    # estimate. Raising from it (as Streamlit does from st.* calls once
+                    # a session is rerun or closed) abandons the wait.
+                    if on_queued is not None:
+                        on_queued(estimated_wait)
+                    with self._condition:
+                        # Strict priority order: only the front of the queue may start, so a
+                        # large transcription is never starved by smaller jobs slipping past it
+                        if self._next_job() is not job or not self._fits(job):
+                            self._condition.wait(timeout=1.0)
+                        if self._next_job() is job and self._fits(job):
+                            self._queue.remove(job)
+                            self._start(job)
+                            break
+                        estimated_wait = self._estimate_wait(job)
+            except BaseException:
+                # An abandoned waiter (e.g. a Streamlit rerun) must not block the queue
+                with self._condition:
+                    if job in self._queue:
+                        self._queue.remove(job)
+                    self._condition.notify_all()
+                raise
+
+        try:
+            yield job
+        except BaseException:
+            job.succeeded = False
+            raise
+        finally:
+            with self._condition:
+                self._running.remove(job)
+                self.memory_in_use -= job.memory_mb
+                self.cpus_in_use -= job.cpus
+                if job.succeeded and job.video_duration > 0:
+                    # Moving average of observed runtime keeps wait estimates honest
+                    cost = self.stage_costs[stage]
+                    observed = (time.monotonic() - job.started_at) / job.video_duration
+                    cost['seconds_per_video_second'] = 0.8 * cost['seconds_per_video_second'] + 0.2 * observed
+                self._condition.notify_all()
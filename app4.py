@@ -2,9 +2,14 @@ import streamlit as st
 import hashlib
 import whisper
 import ffmpeg
+from reel_concat import has_audio_stream, reel_from_segments
 from textblob import TextBlob
 import os
+import shutil
+import tempfile
+import threading
 from dotenv import load_dotenv
+from admission import AdmissionController, AdmissionRejected
 
 # Helper function for password hashing
 def hash_password(password):
@@ -187,6 +192,29 @@ def profile():
 def configure():
     load_dotenv()
 
+# One controller per server process, shared by every user session
+@st.cache_resource
+def get_admission_controller():
+    return AdmissionController(
+        memory_budget_mb=int(os.getenv('REEL_MEMORY_BUDGET_MB', '4096')),
+        cpu_budget=int(os.getenv('REEL_CPU_BUDGET', str(os.cpu_count() or 2))),
+        max_queue=int(os.getenv('REEL_MAX_QUEUE', '16')),
+    )
+
+# Assumed length of videos that report no duration, long enough that their
+# queue priority and wait estimates stay on the conservative side
+UNKNOWN_VIDEO_DURATION = 3600
+
+def get_video_duration(probe):
+    # Fall back to the longest stream when the container has no duration
+    for durations in ([probe['format'].get('duration')],
+                      [stream.get('duration') for stream in probe['streams']]):
+        try:
+            return max(float(d) for d in durations if d not in (None, 'N/A'))
+        except ValueError:
+            continue
+    return UNKNOWN_VIDEO_DURATION
+
 def extract_audio(video_path, output_audio_path):
     try:
         ffmpeg.input(video_path).output(output_audio_path).run(overwrite_output=True)
@@ -195,9 +223,17 @@ def extract_audio(video_path, output_audio_path):
         st.error(f"Error extracting audio: {e}")
         return False
 
+# The model is loaded once per server process rather than once per job. A model
+# instance cannot run two transcriptions at once, so calls are serialized; the
+# admission controller already runs one transcription at a time.
+@st.cache_resource
+def load_whisper_model():
+    return whisper.load_model("base"), threading.Lock()
+
 def transcribe_audio(audio_path):
-    model = whisper.load_model("base")
-    result = model.transcribe(audio_path)
+    model, model_lock = load_whisper_model()
+    with model_lock:
+        result = model.transcribe(audio_path)
     return result['text'], result['segments']
 
 def analyze_text_importance(segments):
@@ -238,52 +274,82 @@ def extract_video_segment(video_path, start_time, end_time, output_path):
         st.error(f"Error extracting video segment: {e}")
         return False
 
-def compile_video_segments(segment_paths, output_video_path):
-    with open('file_list.txt', 'w') as f:
-        for segment in segment_paths:
-            f.write(f"file '{segment}'\n")
+def compile_reel_from_segments(video_path, segments, output_video_path, with_audio=True):
+    valid_segments = []
+    for segment in segments:
+        duration = segment['end_time'] - segment['start_time']
+        if duration <= 0:
+            st.error(f"Invalid segment duration: {duration} seconds.")
+            continue
+        valid_segments.append(segment)
+    if not valid_segments:
+        st.error("No valid segments to compile.")
+        return False
     try:
-        ffmpeg.input('file_list.txt', format='concat', safe=0).output(output_video_path, c='copy').run(overwrite_output=True)
-        os.remove('file_list.txt')
+        reel_from_segments(video_path, valid_segments, output_video_path, with_audio).run(overwrite_output=True)
         return True
     except Exception as e:
         st.error(f"Error compiling videos: {e}")
         return False
 
-def generate_reel_from_important_segments(video_path, top_n=5, reel_count=3):
-    audio_path = 'output_audio.wav'
-    
-    st.info("Extracting audio...")
-    if not extract_audio(video_path, audio_path):
+def generate_reel_from_important_segments(video_path, work_dir, top_n=5, reel_count=3, debug=False):
+    audio_path = os.path.join(work_dir, 'output_audio.wav')
+    controller = get_admission_controller()
+
+    # Probe once up front; if ffprobe cannot read the file, ffmpeg will not either
+    try:
+        probe = ffmpeg.probe(video_path)
+    except Exception as e:
+        st.error(f"Error reading video: {e}")
         return
+    video_duration = get_video_duration(probe)
+    with_audio = has_audio_stream(probe)
+
+    # Refreshed on every wake-up while queued; the st.* call is also where Streamlit
+    # aborts the wait once this session is rerun or closed
+    queue_status = st.empty()
 
-    st.info("Transcribing audio...")
-    _, segments = transcribe_audio(audio_path)
-    st.success("Transcription and timestamp extraction completed.")
+    def show_queued(estimated_wait):
+        queue_status.info(f"Server is busy, your video is queued (estimated wait ~{estimated_wait:.0f}s)...")
+
+    try:
+        with controller.admit('transcription', video_duration, on_queued=show_queued) as job:
+            queue_status.empty()
+            st.info("Extracting audio...")
+            if not extract_audio(video_path, audio_path):
+                job.succeeded = False
+                return
+
+            st.info("Transcribing audio...")
+            _, segments = transcribe_audio(audio_path)
+            st.success("Transcription and timestamp extraction completed.")
+    except AdmissionRejected as e:
+        st.error(f"Server is at capacity, please try again in about {e.estimated_wait:.0f} seconds.")
+        return
 
     st.info("Analyzing segments...")
     important_segments = analyze_text_importance(segments)
     important_segments.sort(key=lambda x: x['importance_score'], reverse=True)
 
     # Generate multiple reels with different segments
-    for reel_num in range(1, reel_count + 1):
-        st.info(f"Generating video segments for Reel {reel_num}...")
-        top_segments = important_segments[(reel_num - 1) * top_n : reel_num * top_n]
-        
-        segment_paths = []
-        for i, segment in enumerate(top_segments):
-            output_segment_path = f"segment_reel{reel_num}_{i+1}.mp4"
-            if extract_video_segment(video_path, segment['start_time'], segment['end_time'], output_segment_path):
-                segment_paths.append(output_segment_path)
-            else:
-                st.error(f"Error generating segment {i+1} for Reel {reel_num}")
+    with controller.admit('encoding', video_duration, on_queued=show_queued, can_reject=False):
+        queue_status.empty()
+        for reel_num in range(1, reel_count + 1):
+            top_segments = important_segments[(reel_num - 1) * top_n : reel_num * top_n]
 
+            # Per-segment files are only written when debugging the segment selection
+            if debug:
+                st.info(f"Writing debug segments for Reel {reel_num}...")
+                for i, segment in enumerate(top_segments):
+                    output_segment_path = os.path.join(work_dir, f"segment_reel{reel_num}_{i+1}.mp4")
+                    if not extract_video_segment(video_path, segment['start_time'], segment['end_time'], output_segment_path):
+                        st.error(f"Error generating segment {i+1} for Reel {reel_num}")
 
-        output_reel_path = f'final_reel_{reel_num}.mp4'
-        st.info(f"Compiling Reel {reel_num}...")
-        if compile_video_segments(segment_paths, output_reel_path):
-            st.success(f"Reel {reel_num} compilation successful!")
-            st.video(output_reel_path)
+            output_reel_path = os.path.join(work_dir, f'final_reel_{reel_num}.mp4')
+            st.info(f"Compiling Reel {reel_num}...")
+            if compile_reel_from_segments(video_path, top_segments, output_reel_path, with_audio):
+                st.success(f"Reel {reel_num} compilation successful!")
+                st.video(output_reel_path)
 
 # Updated main_app to accommodate the new function
 def main_app():
@@ -292,10 +358,17 @@ def main_app():
     
     uploaded_file = st.file_uploader("Upload a video file", type=["mp4", "mov", "avi"])
     if uploaded_file is not None:
-        with open("uploaded_video.mp4", "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        st.info("Generating multiple reels from the uploaded video...")
-        generate_reel_from_important_segments("uploaded_video.mp4")
+        # Each job works in its own directory so concurrent users never share files;
+        # st.video has already read the reels into memory by the time it is removed
+        work_dir = tempfile.mkdtemp(prefix="reels_")
+        try:
+            video_path = os.path.join(work_dir, "uploaded_video.mp4")
+            with open(video_path, "wb") as f:
+                f.write(uploaded_file.getbuffer())
+            st.info("Generating multiple reels from the uploaded video...")
+            generate_reel_from_important_segments(video_path, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
     
     if st.button("Logout", key="logout_button", on_click=logout):
         logout()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+
+import ffmpeg
+
+from reel_concat import reel_from_segments
+
+# Bytes written per reel: the old per-segment files + file_list.txt + concat demuxer
+# path against the single-run concat filter that compile_reel_from_segments builds
+# through reel_concat. Write counts come from /proc/self/io, which also accumulates
+# the I/O of every ffmpeg child process once it has been reaped (Linux only).
+
+SEGMENTS = [
+    {'start_time': 3.0, 'end_time': 8.5},
+    {'start_time': 14.0, 'end_time': 19.0},
+    {'start_time': 27.5, 'end_time': 33.0},
+    {'start_time': 41.0, 'end_time': 46.5},
+    {'start_time': 52.0, 'end_time': 57.0},
+]
+
+
+def make_source_video(path, duration=60):
+    video = ffmpeg.input('testsrc2=size=1280x720:rate=30', f='lavfi', t=duration)
+    audio = ffmpeg.input('sine=frequency=440:sample_rate=44100', f='lavfi', t=duration)
+    ffmpeg.output(video, audio, path, vcodec='libx264', acodec='aac').run(overwrite_output=True, quiet=True)
+
+
+def old_path(video_path, segments, workdir):
+    segment_paths = []
+    for i, segment in enumerate(segments):
+        output_path = os.path.join(workdir, f'segment_{i + 1}.mp4')
+        duration = segment['end_time'] - segment['start_time']
+        ffmpeg.input(video_path, ss=segment['start_time'], t=duration).output(output_path).run(overwrite_output=True, quiet=True)
+        segment_paths.append(output_path)
+    list_path = os.path.join(workdir, 'file_list.txt')
+    with open(list_path, 'w') as f:
+        for segment_path in segment_paths:
+            f.write(f"file '{segment_path}'\n")
+    reel_path = os.path.join(workdir, 'reel.mp4')
+    ffmpeg.input(list_path, format='concat', safe=0).output(reel_path, c='copy').run(overwrite_output=True, quiet=True)
+
+
+def new_path(video_path, segments, workdir):
+    reel_path = os.path.join(workdir, 'reel.mp4')
+    reel_from_segments(video_path, segments, reel_path).run(overwrite_output=True, quiet=True)
+
+
+def io_counters():
+    with open('/proc/self/io') as f:
+        return {key: int(value) for key, value in (line.split(': ') for line in f)}
+
+
+def main():
+    root = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(root, 'source.mp4')
+        make_source_video(video_path)
+        print(f"Source: {os.path.getsize(video_path)} bytes, {len(SEGMENTS)} segments per reel")
+        for name, build in (('per-segment files + concat demuxer', old_path),
+                            ('single-run concat filter', new_path)):
+            workdir = os.path.join(root, build.__name__)
+            os.mkdir(workdir)
+            before = io_counters()
+            build(video_path, SEGMENTS, workdir)
+            after = io_counters()
+            files = sorted(os.listdir(workdir))
+            # wchar counts every byte handed to write(), including ffmpeg's log output;
+            # write_bytes is what reached the storage layer
+            print(f"{name}: wchar {after['wchar'] - before['wchar']} bytes, "
+                  f"write_bytes {after['write_bytes'] - before['write_bytes']} bytes, "
+                  f"{len(files)} files left ({', '.join(files)})")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import whisper
 import ffmpeg
+from reel_concat import has_audio_stream, reel_from_segments
 from textblob import TextBlob
 import os
 import openai  # Make sure to install the OpenAI Python package
@@ -54,15 +55,21 @@ def extract_video_segment(video_path, start_time, end_time, output_path):
     except Exception as e:
         print(f"Error extracting video segment: {e}")
 
-# Step 5: Compile Extracted Segments into 30-Second Reel
-def compile_video_segments(segment_paths, output_video_path):
-    with open('file_list.txt', 'w') as f:
-        for segment in segment_paths:
-            f.write(f"file '{segment}'\n")
+# Step 5: Compile Segments into 30-Second Reel straight from the source video
+def compile_reel_from_segments(video_path, segments, output_video_path, with_audio=True):
+    valid_segments = []
+    for segment in segments:
+        duration = segment['end_time'] - segment['start_time']
+        if duration <= 0:
+            print(f"Invalid segment duration: {duration} seconds.")
+            continue
+        valid_segments.append(segment)
+    if not valid_segments:
+        print("No valid segments to compile.")
+        return
     try:
-        ffmpeg.input('file_list.txt', format='concat', safe=0).output(output_video_path, c='copy').run(overwrite_output=True)
+        reel_from_segments(video_path, valid_segments, output_video_path, with_audio).run(overwrite_output=True)
         print(f"Compiled reel created: {output_video_path}")
-        os.remove('file_list.txt')
     except Exception as e:
         print(f"Error compiling videos: {e}")
 
@@ -75,7 +82,14 @@ def validate_video_content(segment_paths):
             print(f"Segment {segment} exists and is valid.")
 
 # Full Process: Generate Reel from Important Segments
-def generate_reel_from_important_segments(video_path, top_n=5):
+def generate_reel_from_important_segments(video_path, top_n=5, debug=False):
+    # Probe once up front; if ffprobe cannot read the file, ffmpeg will not either
+    try:
+        with_audio = has_audio_stream(ffmpeg.probe(video_path))
+    except Exception as e:
+        print(f"Error probing video: {e}")
+        return
+
     audio_path = 'output_audio.wav'
     extract_audio(video_path, audio_path)
     _, segments = transcribe_audio(audio_path)
@@ -83,18 +97,18 @@ def generate_reel_from_important_segments(video_path, top_n=5):
     important_segments = analyze_text_importance(segments)
     important_segments.sort(key=lambda x: x['importance_score'], reverse=True)
     top_segments = important_segments[:top_n]
-    
-    segment_paths = []
-    for i, segment in enumerate(top_segments):
-        start_time = segment['start_time']
-        end_time = segment['end_time']
-        output_path = f'segment_{i + 1}.mp4'
-        extract_video_segment(video_path, start_time, end_time, output_path)
-        segment_paths.append(output_path)
+
+    # Per-segment files are only written when debugging the segment selection
+    if debug:
+        segment_paths = []
+        for i, segment in enumerate(top_segments):
+            output_path = f'segment_{i + 1}.mp4'
+            extract_video_segment(video_path, segment['start_time'], segment['end_time'], output_path)
+            segment_paths.append(output_path)
+        validate_video_content(segment_paths)
 
     compiled_video_path = 'compiled_reel.mp4'
-    compile_video_segments(segment_paths, compiled_video_path)
-    validate_video_content(segment_paths)
+    compile_reel_from_segments(video_path, top_segments, compiled_video_path, with_audio)
 
     # Cleanup
     if os.path.exists(audio_path):
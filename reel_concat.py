@@ -0,0 +1,22 @@
+import ffmpeg
+
+# ffmpeg graph shared by the app scripts and benchmark_reel_disk.py. Kept free of
+# Whisper and Streamlit imports so it can be used and measured on its own.
+
+
+def has_audio_stream(probe):
+    return any(stream['codec_type'] == 'audio' for stream in probe['streams'])
+
+
+def reel_from_segments(video_path, segments, output_video_path, with_audio=True):
+    # Seek into the source once per segment and join them with the concat filter,
+    # so the reel is encoded in a single ffmpeg run without intermediate files.
+    # Video-only sources have no audio track to concatenate.
+    streams = []
+    for segment in segments:
+        duration = segment['end_time'] - segment['start_time']
+        clip = ffmpeg.input(video_path, ss=segment['start_time'], t=duration)
+        streams.append(clip.video)
+        if with_audio:
+            streams.append(clip.audio)
+    return ffmpeg.concat(*streams, v=1, a=1 if with_audio else 0).output(output_video_path)
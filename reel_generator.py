@@ -1,5 +1,6 @@
 import whisper
 import ffmpeg
+from reel_concat import has_audio_stream, reel_from_segments
 from textblob import TextBlob
 import os
 import streamlit as st
@@ -139,17 +140,25 @@ def extract_video_segment(video_path, start_time, end_time, output_path):
     except Exception as e:
         print(f"Error extracting video segment: {e}")
 
-# Step 5: Compile Extracted Segments into 30-Second Reels
-def compile_video_segments(segment_paths, output_video_path):
-    # Sort the segment paths based on their timestamps
-    segment_paths.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))  # Adjust the key based on how your segment filenames are structured
+# Step 5: Compile Segments into 30-Second Reels straight from the source video
+def compile_reel_from_segments(video_path, segments, output_video_path, with_audio=True):
+    # Keep the reel in chronological order
+    segments = sorted(segments, key=lambda x: x['start_time'])
 
-    with open('file_list.txt', 'w') as f:
-        for segment in segment_paths:
-            f.write(f"file '{segment}'\n")
+    valid_segments = []
+    for segment in segments:
+        duration = segment['end_time'] - segment['start_time']
+        if duration <= 0:
+            print(f"Invalid segment duration: {duration} seconds.")
+            continue
+        valid_segments.append(segment)
+
+    if not valid_segments:
+        print("No valid segments to compile.")
+        return
 
     try:
-        ffmpeg.input('file_list.txt', format='concat', safe=0).output(output_video_path, c='copy').run()
+        reel_from_segments(video_path, valid_segments, output_video_path, with_audio).run(overwrite_output=True)
         print(f"Compiled reel created: {output_video_path}")
     except Exception as e:
         print(f"Error compiling videos: {e}")
@@ -157,7 +166,14 @@ def compile_video_segments(segment_paths, output_video_path):
 
 
 # Full Process: Generate Multiple Reels from Important Segments
-def generate_reels_from_important_segments(video_path, audio_path, top_n=5):
+def generate_reels_from_important_segments(video_path, audio_path, top_n=5, debug=False):
+    # Probe once up front; if ffprobe cannot read the file, ffmpeg will not either
+    try:
+        with_audio = has_audio_stream(ffmpeg.probe(video_path))
+    except Exception as e:
+        print(f"Error probing video: {e}")
+        return []
+
     extract_audio(video_path, audio_path)
     _, segments = transcribe_audio(audio_path)
     print("Transcription and timestamp extraction completed.")
@@ -165,24 +181,24 @@ def generate_reels_from_important_segments(video_path, audio_path, top_n=5):
     important_segments = analyze_text_importance(segments)
     important_segments.sort(key=lambda x: x['importance_score'], reverse=True)
 
-    compiled_video_paths = []  # List to store compiled video paths
+    reels = []  # (segments, debug segment paths, compiled video path) per reel
     for reel_index in range(3):
         top_segments = important_segments[reel_index * top_n:(reel_index + 1) * top_n]
         top_segments.sort(key=lambda x: x['start_time'])
 
+        # Per-segment files are only written when debugging the segment selection
         segment_paths = []
-        for i, segment in enumerate(top_segments):
-            start_time = segment['start_time']
-            end_time = segment['end_time']
-            output_path = f'reel_{reel_index + 1}_segment_{i + 1}.mp4'
-            extract_video_segment(video_path, start_time, end_time, output_path)
-            segment_paths.append(output_path)
+        if debug:
+            for i, segment in enumerate(top_segments):
+                output_path = f'reel_{reel_index + 1}_segment_{i + 1}.mp4'
+                extract_video_segment(video_path, segment['start_time'], segment['end_time'], output_path)
+                segment_paths.append(output_path)
 
         compiled_video_path = f'reel_{reel_index + 1}.mp4'
-        compile_video_segments(segment_paths, compiled_video_path)
-        compiled_video_paths.append(compiled_video_path)  # Add compiled path to the list
+        compile_reel_from_segments(video_path, top_segments, compiled_video_path, with_audio)
+        reels.append((top_segments, segment_paths, compiled_video_path))
 
-    return compiled_video_paths  # Return only compiled video paths
+    return reels
 
 
 
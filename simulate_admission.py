@@ -0,0 +1,155 @@
+import mmap
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+
+from admission import STAGE_COSTS, AdmissionController, AdmissionRejected
+
+# Load simulation for the admission controller. Kept out of admission.py so the
+# server does not import Unix-only modules. Run with `python simulate_admission.py`.
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _hold_memory(memory_mb, seconds):
+    # Anonymous mapping with every page written, so it really counts towards RSS
+    # and is handed back to the OS as soon as it is closed
+    size = int(memory_mb * 1024 * 1024)
+    block = mmap.mmap(-1, size)
+    try:
+        for offset in range(0, size, mmap.PAGESIZE):
+            block[offset] = 1
+        time.sleep(seconds)
+    finally:
+        block.close()
+
+
+def _unbounded_peak_mb(jobs, stage_costs, memory_scale):
+    # Memory the same arrivals would need if every job started its stages immediately
+    events = []
+    for arrival, video_duration in jobs:
+        start = arrival
+        for stage in ('transcription', 'encoding'):
+            end = start + stage_costs[stage]['seconds_per_video_second'] * video_duration
+            memory_mb = stage_costs[stage]['memory_mb'] * memory_scale
+            events.extend([(start, memory_mb), (end, -memory_mb)])
+            start = end
+    peak = in_use = 0
+    for _, delta in sorted(events):
+        in_use += delta
+        peak = max(peak, in_use)
+    return peak
+
+
+# Load simulation: synthetic jobs arrive faster than the budget can serve them.
+# Stage runtimes are shrunk by time_scale so an hour of video takes seconds, and
+# each admitted stage allocates its (scaled down) memory footprint for real.
+def simulate(job_count=40, arrival_interval=0.4, memory_budget_mb=4096, cpu_budget=4,
+             time_scale=0.001, memory_scale=1 / 16, seed=0):
+    rng = random.Random(seed)
+    stage_costs = {stage: dict(cost, seconds_per_video_second=cost['seconds_per_video_second'] * time_scale)
+                   for stage, cost in STAGE_COSTS.items()}
+    controller = AdmissionController(memory_budget_mb, cpu_budget, max_queue=16,
+                                     max_wait=1800 * time_scale, aging_rate=1.0 / time_scale,
+                                     stage_costs=stage_costs)
+    latencies = {'short': [], 'long': []}
+    rejected = []
+    lock = threading.Lock()
+
+    def run_job(video_duration):
+        submitted = time.monotonic()
+        try:
+            for stage in ('transcription', 'encoding'):
+                with controller.admit(stage, video_duration, can_reject=stage == 'transcription'):
+                    _hold_memory(stage_costs[stage]['memory_mb'] * memory_scale,
+                                 stage_costs[stage]['seconds_per_video_second'] * video_duration)
+        except AdmissionRejected as e:
+            with lock:
+                rejected.append(e.estimated_wait)
+            return
+        with lock:
+            latencies['short' if video_duration <= 300 else 'long'].append(time.monotonic() - submitted)
+
+    jobs = [(i * arrival_interval, rng.choice([rng.uniform(30, 300), rng.uniform(600, 3600)]))
+            for i in range(job_count)]
+    baseline_rss_mb = _peak_rss_mb()
+    threads = []
+    for _, video_duration in jobs:
+        thread = threading.Thread(target=run_job, args=(video_duration,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(arrival_interval)
+    for thread in threads:
+        thread.join()
+    rss_growth_mb = _peak_rss_mb() - baseline_rss_mb
+
+    budget_mb = memory_budget_mb * memory_scale
+    completed = sum(map(len, latencies.values()))
+    print(f"Jobs submitted: {job_count}, completed: {completed}, "
+          f"rejected: {len(rejected)} ({100 * len(rejected) / job_count:.0f}%)")
+    print(f"Peak RSS growth: {rss_growth_mb:.0f} MB against a {budget_mb:.0f} MB budget "
+          f"(without admission these arrivals would need {_unbounded_peak_mb(jobs, stage_costs, memory_scale):.0f} MB)")
+    for kind, values in latencies.items():
+        if values:
+            print(f"Median latency ({kind} videos): {statistics.median(values):.2f}s over {len(values)} jobs")
+    if rejected:
+        print(f"Median estimated wait quoted on rejection: {statistics.median(rejected):.1f}s")
+
+    # Interpreter and thread stacks get a small allowance on top of the budget
+    assert rss_growth_mb <= budget_mb + 32, f"RSS grew {rss_growth_mb:.0f} MB, budget is {budget_mb:.0f} MB"
+    assert controller.memory_in_use == 0 and controller.cpus_in_use == 0
+    return controller, latencies, rejected
+
+
+# A waiter whose progress hook raises (a closed or rerun Streamlit session) must
+# leave the queue while the job ahead of it is still running, not when its turn comes
+def check_cancelled_waiter():
+    controller = AdmissionController(memory_budget_mb=4096, cpu_budget=4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def running_job():
+        with controller.admit('transcription', 60):
+            started.set()
+            release.wait()
+
+    thread = threading.Thread(target=running_job)
+    thread.start()
+    started.wait()
+
+    class SessionClosed(BaseException):
+        pass
+
+    estimates = []
+
+    def on_queued(estimated_wait):
+        estimates.append(estimated_wait)
+        if len(estimates) == 2:
+            raise SessionClosed
+
+    try:
+        with controller.admit('transcription', 60, on_queued=on_queued):
+            pass
+    except SessionClosed:
+        pass
+    try:
+        assert not controller._queue, "cancelled waiter is still queued"
+        assert len(controller._running) == 1, "running job should be unaffected"
+        assert estimates[1] < estimates[0], "wait estimate was not refreshed"
+    finally:
+        release.set()
+        thread.join()
+    print(f"Cancelled waiter left the queue while another job was running "
+          f"(estimates {estimates[0]:.1f}s -> {estimates[1]:.1f}s)")
+
+
+if __name__ == '__main__':
+    check_cancelled_waiter()
+    simulate()